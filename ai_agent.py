@@ -4,15 +4,17 @@ import os
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from resilience import LLM_STAGE, run_blocking
+
 # --- FIX: Load .env variables explicitly at the start ---
 load_dotenv()
 
 # Configure the Gemini API client from the loaded .env variable
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
-def get_ai_response(conversation_history: list, persona: str) -> str:
+def _generate(conversation_history: list, persona: str) -> str:
     """
-    Gets a conversational response from the Gemini model, applying a persona.
+    Makes a single Gemini call. Errors are raised, not swallowed, so the caller decides.
     """
     model = genai.GenerativeModel(
         model_name='gemini-2.5-pro',
@@ -25,12 +27,16 @@ def get_ai_response(conversation_history: list, persona: str) -> str:
         content = f"[{msg.get('name', 'User')}]: {msg.get('content', '')}"
         gemini_history.append({'role': role, 'parts': [content]})
 
-    try:
-        response = model.generate_content(
-            gemini_history,
-            generation_config=genai.types.GenerationConfig(temperature=0.8),
-        )
-        return response.text
-    except Exception as e:
-        print(f"Error getting AI response from Gemini: {e}")
-        return "I seem to be having trouble thinking right now. Let's try that again."
\ No newline at end of file
+    response = model.generate_content(
+        gemini_history,
+        generation_config=genai.types.GenerationConfig(temperature=0.8),
+        request_options={"timeout": LLM_STAGE.attempt_timeout},
+    )
+    return response.text
+
+async def generate_ai_response(conversation_history: list, persona: str) -> str:
+    """
+    Gets a response through the LLM resilience stage (deadline, retries, breaker).
+    Raises StageUnavailable when no response could be produced in time.
+    """
+    return await LLM_STAGE.call(lambda: run_blocking(_generate, conversation_history, persona))
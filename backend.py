@@ -8,9 +8,10 @@ import uuid
 import os
 import base64
 
-from ai_agent import get_ai_response
+from ai_agent import generate_ai_response
+from resilience import STT_STAGE, StageUnavailable, run_blocking
+from voice_synthesis import generate_speech
 import google.generativeai as genai
-import edge_tts
 
 load_dotenv()
 app = FastAPI()
@@ -26,32 +27,41 @@ def clean_response_text(text: str) -> str:
     return text.replace('*', '').replace('#', '').strip()
 
 async def generate_ai_speech(text: str, voice_name: str):
+    """
+    Returns base64-encoded audio, or None when TTS is unavailable (text-only degraded mode).
+    """
     try:
-        communicate = edge_tts.Communicate(text, voice_name)
-        audio_bytes = b""
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                audio_bytes += chunk["data"]
-        return audio_bytes
-    except Exception as e:
-        print(f"Error generating speech: {e}")
+        audio_bytes = await generate_speech(text, voice_name)
+    except StageUnavailable as e:
+        print(f"Error generating speech, falling back to text-only: {e}")
         return None
+    return base64.b64encode(audio_bytes).decode('utf-8')
 
-def transcribe_audio_with_gemini(audio_file_path: str):
+def _transcribe_with_gemini(audio_bytes: bytes) -> str:
+    # Each attempt owns its temp file, so an abandoned attempt never loses its upload.
+    temp_audio_path = f"temp_{uuid.uuid4()}.wav"
+    with open(temp_audio_path, "wb") as f: f.write(audio_bytes)
     uploaded_file = None
     try:
-        uploaded_file = genai.upload_file(path=audio_file_path)
+        uploaded_file = genai.upload_file(path=temp_audio_path)
         model = genai.GenerativeModel(model_name="models/gemini-1.5-flash")
-        response = model.generate_content(["Transcribe this audio file accurately.", uploaded_file])
+        response = model.generate_content(
+            ["Transcribe this audio file accurately.", uploaded_file],
+            request_options={"timeout": STT_STAGE.attempt_timeout},
+        )
         return response.text.strip()
-    except Exception as e:
-        print(f"Error during Gemini transcription: {e}")
-        return "[Transcription failed]"
     finally:
+        os.remove(temp_audio_path)
         if uploaded_file:
             try: genai.delete_file(uploaded_file.name)
             except Exception: pass
 
+async def transcribe_audio_with_gemini(audio_bytes: bytes) -> str:
+    """
+    Transcribes through the STT resilience stage. Raises StageUnavailable on failure.
+    """
+    return await STT_STAGE.call(lambda: run_blocking(_transcribe_with_gemini, audio_bytes))
+
 # --- Agent Configuration for a REAL GD ---
 agents = ["Milo", "Ray", "Nova", "Ava"]
 voice_map = {"Ava": "en-US-AriaNeural", "Milo": "en-AU-WilliamNeural", "Ray": "en-US-GuyNeural", "Nova": "en-CA-ClaraNeural"}
@@ -66,14 +76,12 @@ natural_personas = {
 @app.post("/start_discussion")
 async def start_discussion_from_audio(audio_file: UploadFile = File(...)):
     session_id = str(uuid.uuid4())
-    temp_audio_path = f"temp_{session_id}_topic.wav"
-    with open(temp_audio_path, "wb") as f: f.write(await audio_file.read())
-        
-    topic = transcribe_audio_with_gemini(temp_audio_path)
-    os.remove(temp_audio_path)
 
-    if "[Transcription failed]" in topic:
-        return JSONResponse(status_code=500, content={"error": "Transcription of the topic failed."})
+    try:
+        topic = await transcribe_audio_with_gemini(await audio_file.read())
+    except StageUnavailable as e:
+        print(f"Error during Gemini transcription: {e}")
+        return JSONResponse(status_code=503, content={"error": "Transcription of the topic failed."})
 
     history = [{"role": "user", "name": "Moderator", "content": f"The topic is: '{topic}'."}]
     kickoff_msg = f"Okay team, our topic is '{topic}'. This should be a good one. Milo, you seem excited, why don't you give us an optimistic opening take?"
@@ -81,40 +89,46 @@ async def start_discussion_from_audio(audio_file: UploadFile = File(...)):
     
     conversations[session_id] = {"history": history, "last_speaker": "Ava"}
     
-    audio_bytes = await generate_ai_speech(kickoff_msg, voice_map["Ava"])
-    audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
+    audio_b64 = await generate_ai_speech(kickoff_msg, voice_map["Ava"])
+    degraded = [] if audio_b64 else ["tts"]
     
-    return JSONResponse(content={"session_id": session_id, "topic": topic, "text": kickoff_msg, "audio_b64": audio_b64, "speaker": "Ava"})
+    return JSONResponse(content={"session_id": session_id, "topic": topic, "text": kickoff_msg, "audio_b64": audio_b64, "speaker": "Ava", "degraded": degraded})
 
 @app.post("/chat/{session_id}")
 async def chat(session_id: str, audio_file: UploadFile = File(...)):
     session = conversations.get(session_id)
     if not session: return JSONResponse(status_code=404, content={"error": "Session not found"})
 
-    temp_audio_path = f"temp_{session_id}_chat.wav"
-    with open(temp_audio_path, "wb") as f: f.write(await audio_file.read())
-        
-    user_text = transcribe_audio_with_gemini(temp_audio_path)
-    os.remove(temp_audio_path)
-
-    if "[Transcription failed]" in user_text: return JSONResponse(status_code=500, content={"error": "Transcription failed"})
+    try:
+        user_text = await transcribe_audio_with_gemini(await audio_file.read())
+    except StageUnavailable as e:
+        print(f"Error during Gemini transcription: {e}")
+        return JSONResponse(status_code=503, content={"error": "Transcription failed"})
 
+    previous_speaker = session["last_speaker"]
     session["history"].append({"role": "user", "name": "User", "content": user_text})
     session["last_speaker"] = "User"
     
     possible_speakers = [agent for agent in agents if agent != session["last_speaker"]]
     current_agent = random.choice(possible_speakers)
     
-    raw_response = get_ai_response(session["history"], natural_personas[current_agent])
+    try:
+        raw_response = await generate_ai_response(session["history"], natural_personas[current_agent])
+    except StageUnavailable as e:
+        # Roll the user's turn back so the history matches the UI, which drops it on errors.
+        print(f"Error getting AI response from Gemini: {e}")
+        session["history"].pop()
+        session["last_speaker"] = previous_speaker
+        return JSONResponse(status_code=503, content={"error": "The team could not respond in time. Please say that again."})
     cleaned_response = clean_response_text(raw_response)
     
     session["history"].append({"role": "assistant", "name": current_agent, "content": cleaned_response})
     session["last_speaker"] = current_agent
     
-    audio_bytes = await generate_ai_speech(cleaned_response, voice_map[current_agent])
-    audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
+    audio_b64 = await generate_ai_speech(cleaned_response, voice_map[current_agent])
+    degraded = [] if audio_b64 else ["tts"]
     
-    return JSONResponse(content={"user_text": user_text, "text": cleaned_response, "audio_b64": audio_b64, "speaker": current_agent})
+    return JSONResponse(content={"user_text": user_text, "text": cleaned_response, "audio_b64": audio_b64, "speaker": current_agent, "degraded": degraded})
 
 @app.get("/")
 async def root():
@@ -0,0 +1,157 @@
+# discussion_engine.py (The turn loop shared by app.py and load_simulator.py)
+
+import random
+import time
+
+from textblob import TextBlob
+
+from resilience import StageUnavailable
+
+agents = ["Milo", "Ray", "Nova", "Ava"]
+voice_map = {"Ava": "en-US-AriaNeural", "Milo": "en-AU-WilliamNeural", "Ray": "en-US-GuyNeural", "Nova": "en-CA-ClaraNeural"}
+QUIT_COMMANDS = {"quit", "quiet", "exit", "stop", "end discussion", "end the conversation"}
+
+concise_personas = {
+    "Ava": "You are Ava, the team lead. Your responses must be VERY CONCISE (1-2 sentences). You guide the conversation and summarize conflicts.",
+    "Milo": "You are Milo, an optimist. Proactively argue for ADVANTAGES. Keep your points VERY CONCISE (2-3 sentences max).",
+    "Ray": "You are Ray, a pragmatist. Proactively argue for DISADVANTAGES. Your arguments must be VERY CONCISE (2-3 sentences max).",
+    "Nova": "You are Nova, the user advocate. Analyze the HUMAN IMPACT of the arguments. Keep your analysis VERY CONCISE (2-3 sentences max)."
+}
+
+# Returned by audio_io.listen to end a discussion without matching a quit command.
+END_DISCUSSION = object()
+
+# Outcomes reported to `on_turn` for every agent turn.
+TURN_OK, TURN_LLM_FAILED, TURN_TTS_TEXT_ONLY = "ok", "llm_failed", "tts_text_only"
+
+SUMMARY_PROMPT = "The discussion is over. As Ava, summarize the core conflict. Importantly, ALSO SUMMARIZE the key points the human 'Participant' made and how they influenced the discussion. Keep it concise."
+
+# --- Helper Functions ---
+def clean_response_text(text: str) -> str:
+    phrases_to_remove = ['(As Ava)', '(As Milo)', '(As Ray)', '(As Nova)', 'Ava:', 'Milo:', 'Ray:', 'Nova:', '[Milo]:', '[Ray]:', '[Nova]:', '[Ava]:']
+    for phrase in phrases_to_remove:
+        text = text.replace(phrase, '')
+    return text.replace('*', '').replace('#', '').strip()
+
+def analyze_user_performance(user_inputs, tool):
+    if not user_inputs: return None
+    grammar_corrections, polarity, subjectivity, words = [], 0, 0, 0
+    for text in user_inputs:
+        matches = tool.check(text)
+        for rule in matches: grammar_corrections.append({"original": text[rule.offset:rule.offset+rule.errorLength], "correction": rule.replacements[0] if rule.replacements else "N/A", "message": rule.message})
+        blob = TextBlob(text)
+        polarity += blob.sentiment.polarity
+        subjectivity += blob.sentiment.subjectivity
+        words += len(text.split())
+    num_inputs = len(user_inputs)
+    return {"grammar": grammar_corrections, "sentiment": polarity / num_inputs if num_inputs > 0 else 0, "subjectivity": subjectivity / num_inputs if num_inputs > 0 else 0, "words": words, "interventions": num_inputs}
+
+# --- THE TURN LOOP ---
+async def run_discussion(audio_io, llm, tts, rng=random, log=print, on_turn=None, quit_commands=QUIT_COMMANDS):
+    """
+    Runs one discussion from topic to summary and returns its history and user inputs.
+
+    The I/O and backends are pluggable so the same loop drives the interactive app and
+    the headless load simulator:
+      - audio_io.listen(prompt) -> str | None | END_DISCUSSION and audio_io.play(audio_bytes) (both async)
+      - llm(conversation_history, persona) -> str, may raise StageUnavailable
+      - tts(text, voice_name) -> bytes, may raise StageUnavailable
+    `on_turn(speaker, outcome, response_seconds, playback_seconds)` is called after every
+    agent turn, including failed ones. `outcome` is TURN_OK, TURN_LLM_FAILED or
+    TURN_TTS_TEXT_ONLY, and the response time covers the LLM reply and TTS but not playback.
+    `quit_commands` are matched as substrings of the user's words; scripted input passes
+    an empty set and ends with END_DISCUSSION instead.
+    """
+    async def get_agent_reply(persona):
+        try:
+            return clean_response_text(await llm(conversation_history, persona))
+        except StageUnavailable as e:
+            log(f"Error getting AI response from Gemini: {e}")
+            return None
+
+    async def speak(text, voice_name):
+        """Synthesizes and plays `text`, returning the seconds spent in playback (None if text-only)."""
+        try:
+            audio_bytes = await tts(text, voice_name)
+        except StageUnavailable as e:
+            # Degraded mode: the text is already printed, so just skip the audio.
+            log(f"(Voice unavailable, continuing text-only: {e})")
+            return None
+        play_start = time.monotonic()
+        await audio_io.play(audio_bytes)
+        return time.monotonic() - play_start
+
+    def end_turn(speaker, turn_start, playback_seconds, outcome=None):
+        if not on_turn: return
+        if outcome is None:
+            outcome = TURN_TTS_TEXT_ONLY if playback_seconds is None else TURN_OK
+        playback_seconds = playback_seconds or 0.0
+        on_turn(speaker, outcome, time.monotonic() - turn_start - playback_seconds, playback_seconds)
+
+    conversation_history = []
+    user_inputs_for_analysis = []
+
+    topic = await audio_io.listen("To begin, please state the topic for the discussion:")
+    if not topic: log("No topic provided. Exiting."); return None
+
+    log(f"\n--- Discussion Topic: {topic} ---")
+    conversation_history.append({"role": "user", "name": "Moderator", "content": f"The topic is: '{topic}'."})
+
+    kickoff_msg = f"Okay team, the topic is '{topic}'. Who has an initial thought?"
+    conversation_history.append({"role": "user", "name": "Ava", "content": kickoff_msg})
+
+    turn_start = time.monotonic()
+    ava_reply = await get_agent_reply(concise_personas["Ava"])
+    cleaned_ava_response = ava_reply or kickoff_msg
+    log(f"\n[Ava]: {cleaned_ava_response}")
+    playback_seconds = await speak(cleaned_ava_response, voice_map["Ava"])
+    conversation_history.append({"role": "assistant", "name": "Ava", "content": cleaned_ava_response})
+    # Falling back to the kickoff message still counts as a failed LLM turn.
+    end_turn("Ava", turn_start, playback_seconds, None if ava_reply else TURN_LLM_FAILED)
+    last_speaker = "Ava"
+
+    while True:
+        user_text = await audio_io.listen("\nYour turn to speak (or say 'quit' to end):")
+        if user_text is END_DISCUSSION:
+            log("Input finished. Ending discussion."); break
+
+        if user_text:
+            if any(command in user_text.lower() for command in quit_commands):
+                log("Quit command recognized. Ending discussion."); break
+            log(f"[You]: {user_text}")
+            conversation_history.append({"role": "user", "name": "Participant", "content": user_text})
+            user_inputs_for_analysis.append(user_text)
+            last_speaker = "Participant"
+        else:
+            log("No user input detected, letting the team continue.")
+
+        possible_speakers = [agent for agent in agents if agent != last_speaker]
+        current_agent = rng.choice(possible_speakers)
+
+        log(f"\n[{current_agent} is thinking...]")
+        turn_start = time.monotonic()
+        cleaned_response = await get_agent_reply(concise_personas[current_agent])
+        if cleaned_response is None:
+            end_turn(current_agent, turn_start, None, TURN_LLM_FAILED)
+            log("The team is having trouble thinking right now. Let's try that again."); continue
+
+        log(f"[{current_agent}]: {cleaned_response}")
+        playback_seconds = await speak(cleaned_response, voice_map[current_agent])
+
+        conversation_history.append({"role": "assistant", "name": current_agent, "content": cleaned_response})
+        end_turn(current_agent, turn_start, playback_seconds)
+        last_speaker = current_agent
+
+    log("\n--- Discussion Concluded ---")
+    conversation_history.append({"role": "user", "name": "Ava", "content": SUMMARY_PROMPT})
+
+    turn_start = time.monotonic()
+    cleaned_summary = await get_agent_reply(concise_personas["Ava"])
+    if cleaned_summary:
+        log("\n[Ava's Summary]:")
+        log(cleaned_summary)
+        end_turn("Ava", turn_start, await speak(cleaned_summary, voice_map["Ava"]))
+    else:
+        end_turn("Ava", turn_start, None, TURN_LLM_FAILED)
+
+    return {"topic": topic, "history": conversation_history, "user_inputs": user_inputs_for_analysis}
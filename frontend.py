@@ -50,9 +50,9 @@ if not st.session_state.session_id and not st.session_state.discussion_ended:
                 st.session_state.messages.append({"name": "Moderator", "content": f"Topic: {st.session_state.topic}"})
                 # Add Ava's opening message
                 st.session_state.messages.append({"name": data["speaker"], "content": data["text"]})
-                # Queue Ava's opening audio for playback
-                audio_bytes = base64.b64decode(data["audio_b64"])
-                st.session_state.autoplay_audio = audio_bytes
+                # Queue Ava's opening audio for playback (absent when the backend fell back to text-only)
+                if data.get("audio_b64"):
+                    st.session_state.autoplay_audio = base64.b64decode(data["audio_b64"])
                 st.rerun()
             else:
                 st.error(f"Could not start the discussion. The server said: {response.text}")
@@ -72,8 +72,8 @@ elif st.session_state.session_id and not st.session_state.discussion_ended:
                 data = response.json()
                 st.session_state.messages.append({"name": "User", "content": data["user_text"]})
                 st.session_state.messages.append({"name": data["speaker"], "content": data["text"]})
-                audio_bytes = base64.b64decode(data["audio_b64"])
-                st.session_state.autoplay_audio = audio_bytes
+                if data.get("audio_b64"):
+                    st.session_state.autoplay_audio = base64.b64decode(data["audio_b64"])
                 st.rerun()
             else:
                 st.error(f"An error occurred. The server said: {response.text}")
@@ -0,0 +1,284 @@
+# load_simulator.py (Headless multi-session load mode for the discussion turn engine)
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+import tracemalloc
+import wave
+from collections import Counter
+
+from discussion_engine import END_DISCUSSION, TURN_LLM_FAILED, TURN_OK, TURN_TTS_TEXT_ONLY, run_discussion, analyze_user_performance
+from resilience import StageUnavailable
+
+MP3_BYTES_PER_SECOND = 6000  # edge_tts streams 48 kbit/s mono MP3
+WORDS_PER_SECOND = 2.5       # Typical speaking rate, used to fake speech duration
+
+# --- Corpus Loading ---
+def load_corpus(path: str, stt: str = "script") -> list:
+    """
+    Loads the scripted user turns. A text file gives one turn per non-empty line; a
+    directory gives one turn per .wav file in name order, with a transcript in a .txt
+    file of the same name. The first turn is used as the topic.
+
+    Raises ValueError when the corpus cannot feed the chosen STT backend: "google"
+    needs .wav files, and "script" needs a transcript for every turn.
+    """
+    turns = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if not name.lower().endswith(".wav"): continue
+            wav_path = os.path.join(path, name)
+            with wave.open(wav_path, "rb") as wav:
+                seconds = wav.getnframes() / wav.getframerate()
+            transcript_path = os.path.splitext(wav_path)[0] + ".txt"
+            text = None
+            if os.path.exists(transcript_path):
+                with open(transcript_path, encoding="utf-8") as f: text = f.read().strip()
+            turns.append({"text": text, "wav": wav_path, "seconds": seconds})
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line: turns.append({"text": line, "wav": None, "seconds": len(line.split()) / WORDS_PER_SECOND})
+    if not turns:
+        raise ValueError(f"No turns found in corpus: {path}")
+    if stt == "google" and turns[0]["wav"] is None:
+        raise ValueError(f"--stt google needs a directory of .wav files, but {path} is a text corpus")
+    if stt == "script":
+        missing = [os.path.basename(turn["wav"]) for turn in turns if turn["text"] is None]
+        if missing:
+            raise ValueError(f"--stt script needs a .txt transcript next to every .wav file; missing for: {', '.join(missing)}")
+    return turns
+
+# --- Fake Audio I/O ---
+class ScriptedAudioIO:
+    """
+    Replays the corpus as one session's user and fakes speaking and playback time,
+    scaled by `pace` (0 runs as fast as the loop allows, 1 is real time). The session
+    ends with END_DISCUSSION once the corpus is used up, so corpus lines that contain
+    quit words ("stop", "exit", ...) are spoken like any other turn.
+    """
+
+    def __init__(self, turns, stt, pace=0.0):
+        self.turns = iter(turns)
+        self.stt = stt
+        self.pace = pace
+        self.turns_consumed = 0
+
+    async def listen(self, prompt):
+        turn = next(self.turns, None)
+        if turn is None:
+            return END_DISCUSSION
+        self.turns_consumed += 1
+        await asyncio.sleep(turn["seconds"] * self.pace)
+        return await self.stt(turn)
+
+    async def play(self, audio_bytes):
+        await asyncio.sleep(len(audio_bytes or b"") / MP3_BYTES_PER_SECOND * self.pace)
+
+class NullGrammarTool:
+    """Stands in for LanguageTool so analysis can run without its Java server."""
+
+    def check(self, text):
+        return []
+
+# --- Pluggable Backends ---
+def make_stt(kind: str):
+    async def scripted_stt(turn):
+        return turn["text"]
+
+    async def google_stt(turn):
+        import speech_recognition as sr
+
+        def recognize():
+            recognizer = sr.Recognizer()
+            with sr.AudioFile(turn["wav"]) as source:
+                audio = recognizer.record(source)
+            try:
+                return recognizer.recognize_google(audio)
+            except Exception:
+                return None
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, recognize)
+
+    return {"script": scripted_stt, "google": google_stt}[kind]
+
+def make_llm(kind: str, latency: float, failure_rate: float, rng: random.Random):
+    if kind == "gemini":
+        from ai_agent import generate_ai_response
+        return generate_ai_response
+
+    async def fake_llm(conversation_history, persona):
+        # Log-normal latency gives the long tail real LLM calls have.
+        await asyncio.sleep(rng.lognormvariate(math.log(latency), 0.5) if latency > 0 else 0)
+        if rng.random() < failure_rate:
+            raise StageUnavailable("fake llm: injected failure")
+        name = persona.split(",")[0].replace("You are ", "")
+        last = conversation_history[-1]["content"]
+        return f"**{name}:** Building on '{last[:60]}', here is another angle worth weighing."
+
+    return fake_llm
+
+def make_tts(kind: str, latency: float, failure_rate: float, rng: random.Random):
+    if kind == "edge":
+        from voice_synthesis import generate_speech
+        return generate_speech
+
+    async def fake_tts(text, voice_name):
+        await asyncio.sleep(rng.lognormvariate(math.log(latency), 0.5) if latency > 0 else 0)
+        if rng.random() < failure_rate:
+            raise StageUnavailable("fake tts: injected failure")
+        # Sized like real MP3 output so playback time and memory stay realistic.
+        return bytes(int(len(text.split()) / WORDS_PER_SECOND * MP3_BYTES_PER_SECOND))
+
+    return fake_tts
+
+# --- Metrics ---
+class LoadMetrics:
+    def __init__(self):
+        self.response_latencies = []
+        self.playback_seconds = []
+        self.turn_outcomes = Counter()
+        self.turns_consumed = []
+        self.loop_lag = []
+        self.sessions_done = 0
+        self.sessions_failed = 0
+
+    def on_turn(self, speaker, outcome, response_seconds, playback_seconds):
+        # Failed turns stay in the latency samples: they are the ones that hit the deadline.
+        self.turn_outcomes[outcome] += 1
+        self.response_latencies.append(response_seconds)
+        self.playback_seconds.append(playback_seconds)
+
+def percentile(values, pct):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def monitor_loop_lag(metrics: LoadMetrics, interval: float = 0.05):
+    """Measures how late the event loop wakes a sleeping task; blocking work shows up here."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        metrics.loop_lag.append(loop.time() - start - interval)
+
+# --- Load Run ---
+async def run_session(index, args, corpus, stt, llm, tts, grammar_tool, metrics):
+    await asyncio.sleep(args.ramp * index / args.sessions)
+    log = (lambda msg: print(f"[session {index}] {msg.strip()}")) if args.verbose else (lambda msg: None)
+    audio_io = ScriptedAudioIO(corpus, stt, args.pace)
+    try:
+        result = await run_discussion(audio_io, llm, tts, rng=random.Random(args.seed + index), log=log,
+                                      on_turn=metrics.on_turn, quit_commands=())
+        if result and args.analyze:
+            result["analysis"] = analyze_user_performance(result["user_inputs"], grammar_tool)
+    except Exception as e:
+        print(f"[session {index}] failed: {e!r}")
+        metrics.sessions_failed += 1
+        return None
+    finally:
+        metrics.turns_consumed.append(audio_io.turns_consumed)
+    if result is None:
+        # The topic turn produced no text (e.g. Google STT could not recognize it).
+        print(f"[session {index}] failed: no topic was recognized")
+        metrics.sessions_failed += 1
+        return None
+    metrics.sessions_done += 1
+    return result
+
+async def run_load(args):
+    corpus = args.corpus_turns
+    rng = random.Random(args.seed)
+    stt = make_stt(args.stt)
+    llm = make_llm(args.llm, args.llm_latency, args.failure_rate, rng)
+    tts = make_tts(args.tts, args.tts_latency, args.failure_rate, rng)
+    grammar_tool = NullGrammarTool()
+    if args.grammar:
+        import language_tool_python
+        grammar_tool = language_tool_python.LanguageTool('en-US')
+
+    metrics = LoadMetrics()
+    if args.memory:
+        tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0] if args.memory else 0
+
+    print(f"--- Running {args.sessions} sessions ({args.llm} LLM, {args.tts} TTS, {len(corpus)} scripted turns each) ---")
+    monitor = asyncio.create_task(monitor_loop_lag(metrics))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_session(i, args, corpus, stt, llm, tts, grammar_tool, metrics) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    monitor.cancel()
+
+    memory = None
+    if args.memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {"peak": (peak - baseline) / args.sessions, "retained": (current - baseline) / args.sessions}
+    if args.grammar:
+        grammar_tool.close()
+
+    print_load_report(metrics, elapsed, memory, len(corpus))
+    return results
+
+def print_load_report(metrics: LoadMetrics, elapsed: float, memory, scripted_turns: int):
+    turns = len(metrics.response_latencies)
+    latencies = metrics.response_latencies
+    outcomes = metrics.turn_outcomes
+    answered = outcomes[TURN_OK] + outcomes[TURN_TTS_TEXT_ONLY]
+    rate = lambda count: 100 * count / turns if turns else 0.0
+    lag_ms = [lag * 1000 for lag in metrics.loop_lag]
+    print("\n--- Load Simulation Report ---")
+    print(f"  Sessions: {metrics.sessions_done} completed, {metrics.sessions_failed} failed in {elapsed:.2f}s")
+    print(f"  Throughput: {turns} agent turns, {answered} answered ({answered / elapsed:.1f} answered turns/s, "
+          f"{metrics.sessions_done / elapsed:.2f} sessions/s)")
+    consumed = metrics.turns_consumed
+    print(f"  Scripted turns consumed per session: min {min(consumed, default=0)}, "
+          f"mean {sum(consumed) / len(consumed) if consumed else 0:.1f} of {scripted_turns}")
+    print(f"  Turn outcomes: {outcomes[TURN_OK]} ok ({rate(outcomes[TURN_OK]):.1f}%), "
+          f"{outcomes[TURN_LLM_FAILED]} llm_failed ({rate(outcomes[TURN_LLM_FAILED]):.1f}%), "
+          f"{outcomes[TURN_TTS_TEXT_ONLY]} tts_text_only ({rate(outcomes[TURN_TTS_TEXT_ONLY]):.1f}%)")
+    print(f"  Response latency (all turns, LLM + TTS, excludes playback): p50 {percentile(latencies, 50):.3f}s, p95 {percentile(latencies, 95):.3f}s, "
+          f"p99 {percentile(latencies, 99):.3f}s, max {max(latencies, default=0):.3f}s")
+    print(f"  Simulated playback: {sum(metrics.playback_seconds):.2f}s total across all turns")
+    print(f"  Event-loop lag: mean {sum(lag_ms) / len(lag_ms) if lag_ms else 0:.2f}ms, "
+          f"p99 {percentile(lag_ms, 99):.2f}ms, max {max(lag_ms, default=0):.2f}ms")
+    if memory:
+        print(f"  Memory per session: peak {memory['peak'] / 1024:.1f} KiB, retained {memory['retained'] / 1024:.1f} KiB")
+    print("--- End of Report ---")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run many simulated group discussions in one event loop.")
+    parser.add_argument("--corpus", required=True, help="Text file (one user turn per line, first line is the topic) or a directory of .wav files")
+    parser.add_argument("--sessions", type=int, default=10, help="Number of concurrent discussions")
+    parser.add_argument("--llm", choices=["fake", "gemini"], default="fake")
+    parser.add_argument("--tts", choices=["fake", "edge"], default="fake")
+    parser.add_argument("--stt", choices=["script", "google"], default="script", help="'script' uses the text corpus or .txt transcripts next to each .wav")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="Median fake LLM latency in seconds")
+    parser.add_argument("--tts-latency", type=float, default=0.5, help="Median fake TTS latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of fake LLM/TTS calls that fail")
+    parser.add_argument("--pace", type=float, default=0.0, help="Scale for simulated speaking/playback time (0 = none, 1 = real time)")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Seconds over which session starts are spread")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--analyze", action="store_true", help="Run the performance analysis at the end of each session")
+    parser.add_argument("--grammar", action="store_true", help="Use LanguageTool for the analysis instead of skipping grammar checks")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Disable tracemalloc (it slows the run down)")
+    parser.add_argument("--verbose", action="store_true", help="Print every session's transcript")
+    args = parser.parse_args(argv)
+    if args.sessions < 1:
+        parser.error("--sessions must be at least 1")
+    try:
+        args.corpus_turns = load_corpus(args.corpus, args.stt)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    return args
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_load(parse_args()))
+    except KeyboardInterrupt:
+        print("\nLoad simulation stopped.")
@@ -0,0 +1,270 @@
+# resilience.py
+
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class StageUnavailable(Exception):
+    """
+    Raised when a stage (LLM, STT or TTS) cannot produce a result within its budget,
+    either because every attempt failed, the deadline passed, or its circuit is open.
+    """
+
+
+class StageRejected(StageUnavailable):
+    """
+    Raised when a stage fails with a non-retryable error (bad input, blocked response,
+    auth). It is not retried and does not count toward the circuit breaker.
+    """
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Default retry predicate: timeouts, connection errors, and API errors whose HTTP
+    status is 408, 429 or 5xx (google.api_core errors expose it as `code`).
+    """
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(exc, "code", None)
+    return isinstance(code, int) and (code in (408, 429) or code >= 500)
+
+
+def retry_any(exc: BaseException) -> bool:
+    return True
+
+
+# --- Latency Tracking (feeds the hedge delay) ---
+class LatencyTracker:
+    """
+    Keeps a rolling window of successful call latencies so the hedge delay can follow
+    the observed p95 instead of a hard-coded guess.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float):
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+# --- Circuit Breaker ---
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls and rejects calls until
+    `reset_timeout` seconds have passed. It then lets a single trial call through
+    (half-open); its outcome decides whether the circuit closes or opens again.
+
+    Outcomes are reported with `trial=True` only by the call that holds the trial slot.
+    While the circuit is not closed, outcomes of calls admitted before it opened are
+    stale and ignored, so they can neither free the slot nor close the circuit.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self, trial: bool = False):
+        if self.state != self.CLOSED and not trial:
+            return
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self, trial: bool = False):
+        if self.state != self.CLOSED and not trial:
+            return
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Frees the half-open slot when a call ends without an outcome (e.g. it was cancelled)."""
+        self.trial_in_flight = False
+
+
+# --- Stage: deadline + retries + hedging + breaker ---
+class Stage:
+    """
+    Wraps one kind of remote call (LLM, STT or TTS).
+
+    Every call gets a hard `deadline` covering all attempts, so the worst-case turn
+    latency is bounded by the sum of the stage deadlines. Inside the deadline, each
+    attempt has its own `attempt_timeout` and failed attempts are retried up to
+    `retries` times with full-jitter exponential backoff, as long as `retryable(error)`
+    says the error is transient; other errors raise StageRejected at once. If an
+    attempt has not answered after the hedge delay (the observed p95, or `hedge_after`
+    until enough samples exist), one duplicate request is started and the first
+    success wins.
+
+    Only hedge stages whose attempts are natively async: a hedged or timed-out
+    run_blocking call keeps its worker thread busy after it loses.
+    """
+
+    def __init__(self, name: str, deadline: float, attempt_timeout: float, retries: int = 2,
+                 backoff: float = 0.25, hedge_after: float = None, hedge_percentile: float = 95,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, retryable=is_transient):
+        self.name = name
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self.retryable = retryable
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    def hedge_delay(self):
+        """Returns how long to wait before hedging, or None when hedging is off."""
+        if self.hedge_after is None or self.breaker.state != CircuitBreaker.CLOSED:
+            return None
+        observed = self.latency.percentile(self.hedge_percentile)
+        return observed if observed is not None else self.hedge_after
+
+    async def call(self, attempt_factory):
+        """
+        Runs `attempt_factory()` (a zero-argument callable returning an awaitable) under
+        this stage's policy. Returns the first successful result or raises StageUnavailable.
+        """
+        if not self.breaker.allow():
+            raise StageUnavailable(f"{self.name}: circuit open, skipping call")
+        trial = self.breaker.state == CircuitBreaker.HALF_OPEN
+        try:
+            result = await asyncio.wait_for(self._run_with_retries(attempt_factory), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            self.breaker.record_failure(trial)
+            raise StageUnavailable(f"{self.name}: deadline of {self.deadline:.1f}s exceeded")
+        except StageRejected:
+            # A client-side error says nothing about the service's health.
+            if trial:
+                self.breaker.release_trial()
+            raise
+        except StageUnavailable:
+            self.breaker.record_failure(trial)
+            raise
+        except BaseException:
+            # Cancellation says nothing about the service's health, but a half-open trial
+            # must not stay reserved forever or every later call is rejected.
+            if trial:
+                self.breaker.release_trial()
+            raise
+        self.breaker.record_success(trial)
+        return result
+
+    async def _run_with_retries(self, attempt_factory):
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            try:
+                return await self._hedged_attempt(attempt_factory)
+            except Exception as e:
+                if not self.retryable(e):
+                    raise StageRejected(f"{self.name}: non-retryable error: {e!r}") from e
+                last_error = e
+                print(f"[{self.name}] attempt {attempt + 1} failed: {e!r}")
+        raise StageUnavailable(f"{self.name}: failed after {self.retries + 1} attempts: {last_error!r}") from last_error
+
+    async def _timed_attempt(self, attempt_factory):
+        start = time.monotonic()
+        result = await asyncio.wait_for(attempt_factory(), timeout=self.attempt_timeout)
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    async def _hedged_attempt(self, attempt_factory):
+        start = time.monotonic()
+        delay = self.hedge_delay()
+        pending = {asyncio.ensure_future(self._timed_attempt(attempt_factory))}
+        hedged = False
+        last_error = None
+        try:
+            while pending:
+                timeout = None
+                if delay is not None and not hedged:
+                    timeout = max(0.0, start + delay - time.monotonic())
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The primary is slower than the hedge delay: race a duplicate against it.
+                    hedged = True
+                    pending.add(asyncio.ensure_future(self._timed_attempt(attempt_factory)))
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+# --- Blocking Calls ---
+# The Gemini SDK is synchronous. Its calls get their own fixed-size pool so abandoned
+# attempts cannot starve the default executor (which app.py uses for the microphone).
+BLOCKING_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("RESILIENCE_BLOCKING_WORKERS", "16")),
+                                       thread_name_prefix="resilience")
+
+
+async def run_blocking(func, *args):
+    """
+    Runs a blocking SDK call in BLOCKING_EXECUTOR. An attempt that times out while still
+    queued is cancelled and never runs; one that already started is abandoned, not killed,
+    so blocking functions should also pass their own timeout to the SDK.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(BLOCKING_EXECUTOR, func, *args)
+
+
+def _env_seconds(name: str, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return None if value.strip().lower() in ("", "off", "none") else float(value)
+
+
+# --- Stage Budgets ---
+# A full turn is STT + LLM + TTS, so its hard upper bound is 20 + 25 + 10 = 55 seconds.
+# STT and LLM wrap blocking Gemini calls, so they retry but never hedge: each call holds
+# at most `retries + 1` = 3 worker threads, and a duplicate gemini-2.5-pro request would
+# double the spend. edge_tts is async, so a losing TTS stream is really cancelled; 3s is
+# well above a normal synthesis of a 1-3 sentence reply, so only stragglers get hedged.
+# Set TTS_HEDGE_AFTER to another number of seconds, or to "off", to change that.
+# Gemini calls only retry transient errors. edge_tts is free and its failures (dropped
+# websockets, "no audio received") are network-side, so TTS retries any error.
+STT_STAGE = Stage("stt", deadline=20.0, attempt_timeout=10.0)
+LLM_STAGE = Stage("llm", deadline=25.0, attempt_timeout=12.0)
+TTS_STAGE = Stage("tts", deadline=10.0, attempt_timeout=6.0, hedge_after=_env_seconds("TTS_HEDGE_AFTER", 3.0),
+                  retryable=retry_any)
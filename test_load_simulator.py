@@ -0,0 +1,132 @@
+# test_load_simulator.py
+
+import asyncio
+import random
+import wave
+
+import pytest
+
+from discussion_engine import TURN_LLM_FAILED, TURN_OK, TURN_TTS_TEXT_ONLY, run_discussion
+from load_simulator import ScriptedAudioIO, load_corpus, make_llm, make_stt, make_tts, parse_args, run_load
+
+CORPUS = "remote work\nI think remote work boosts productivity.\nBut collaboration suffers sometimes.\n"
+
+
+@pytest.fixture
+def corpus_path(tmp_path):
+    path = tmp_path / "turns.txt"
+    path.write_text(CORPUS, encoding="utf-8")
+    return str(path)
+
+
+def test_run_discussion_with_fake_backends(corpus_path):
+    rng = random.Random(0)
+    turns = []
+    result = asyncio.run(run_discussion(
+        ScriptedAudioIO(load_corpus(corpus_path), make_stt("script"), pace=0.01),
+        make_llm("fake", 0, 0.0, rng), make_tts("fake", 0, 0.0, rng),
+        rng=rng, log=lambda msg: None, on_turn=lambda *turn: turns.append(turn),
+    ))
+
+    assert result["topic"] == "remote work"
+    assert result["user_inputs"] == CORPUS.splitlines()[1:]
+    assert turns[0][0] == "Ava" and turns[-1][0] == "Ava"
+    assert len(turns) == 4  # Kickoff, one reply per user turn, summary.
+    assert all(outcome == TURN_OK for _, outcome, _, _ in turns)
+    # Simulated playback is reported on its own, not folded into the response time.
+    assert all(playback > 0 for _, _, _, playback in turns)
+    assert all(response < playback for _, _, response, playback in turns)
+    # Speaker labels added by the fake LLM are stripped by the cleaning step.
+    assert not any("**" in msg["content"] for msg in result["history"] if msg["role"] == "assistant")
+
+
+def test_run_discussion_skips_turns_when_llm_is_unavailable(corpus_path):
+    rng = random.Random(0)
+    turns = []
+    result = asyncio.run(run_discussion(
+        ScriptedAudioIO(load_corpus(corpus_path), make_stt("script")),
+        make_llm("fake", 0, 1.0, rng), make_tts("fake", 0, 0.0, rng), rng=rng, log=lambda msg: None,
+        on_turn=lambda *turn: turns.append(turn),
+    ))
+
+    # The kickoff fallback, both skipped replies and the summary are all reported as failed.
+    assert [outcome for _, outcome, _, _ in turns] == [TURN_LLM_FAILED] * 4
+
+    assistant_turns = [msg for msg in result["history"] if msg["role"] == "assistant"]
+    assert [msg["content"] for msg in assistant_turns] == ["Okay team, the topic is 'remote work'. Who has an initial thought?"]
+
+
+def test_run_load_smoke(corpus_path, capsys):
+    args = parse_args(["--corpus", corpus_path, "--sessions", "3", "--llm-latency", "0", "--tts-latency", "0", "--analyze"])
+    results = asyncio.run(run_load(args))
+
+    assert len(results) == 3
+    assert all(result["analysis"]["interventions"] == 2 for result in results)
+    report = capsys.readouterr().out
+    assert "Sessions: 3 completed, 0 failed" in report
+    assert "Memory per session" in report
+
+
+def test_run_discussion_reports_text_only_turns(corpus_path):
+    rng = random.Random(0)
+    turns = []
+    asyncio.run(run_discussion(
+        ScriptedAudioIO(load_corpus(corpus_path), make_stt("script")),
+        make_llm("fake", 0, 0.0, rng), make_tts("fake", 0, 1.0, rng), rng=rng, log=lambda msg: None,
+        on_turn=lambda *turn: turns.append(turn),
+    ))
+
+    assert [outcome for _, outcome, _, _ in turns] == [TURN_TTS_TEXT_ONLY] * 4
+    assert all(playback == 0.0 for _, _, _, playback in turns)
+
+
+def test_run_load_reports_failed_turns(corpus_path, capsys):
+    args = parse_args(["--corpus", corpus_path, "--sessions", "2", "--llm-latency", "0", "--tts-latency", "0",
+                       "--failure-rate", "1.0", "--no-memory"])
+    asyncio.run(run_load(args))
+
+    report = capsys.readouterr().out
+    assert "0 answered" in report
+    assert "8 llm_failed (100.0%)" in report
+
+
+def test_scripted_lines_with_quit_words_do_not_end_the_session(tmp_path, capsys):
+    path = tmp_path / "turns.txt"
+    path.write_text("remote work\nNonstop meetings are bad.\nPeople exit early.\n", encoding="utf-8")
+    results = asyncio.run(run_load(parse_args(["--corpus", str(path), "--sessions", "2", "--llm-latency", "0",
+                                                "--tts-latency", "0", "--no-memory"])))
+
+    assert all(result["user_inputs"] == ["Nonstop meetings are bad.", "People exit early."] for result in results)
+    assert "Scripted turns consumed per session: min 3, mean 3.0 of 3" in capsys.readouterr().out
+
+
+def test_interactive_quit_command_still_ends_the_discussion():
+    class SaysQuit:
+        def __init__(self):
+            self.lines = iter(["remote work", "ok I'm done, quit"])
+
+        async def listen(self, prompt):
+            return next(self.lines)
+
+        async def play(self, audio_bytes):
+            pass
+
+    rng = random.Random(0)
+    result = asyncio.run(run_discussion(SaysQuit(), make_llm("fake", 0, 0.0, rng), make_tts("fake", 0, 0.0, rng),
+                                        rng=rng, log=lambda msg: None))
+    assert result["user_inputs"] == []
+
+
+def test_parse_args_rejects_google_stt_with_text_corpus(corpus_path):
+    with pytest.raises(SystemExit):
+        parse_args(["--corpus", corpus_path, "--stt", "google"])
+
+
+def test_load_corpus_requires_transcripts_for_script_stt(tmp_path):
+    with wave.open(str(tmp_path / "00.wav"), "wb") as wav:
+        wav.setnchannels(1); wav.setsampwidth(2); wav.setframerate(16000); wav.writeframes(b"\0\0" * 1600)
+
+    with pytest.raises(ValueError, match="00.wav"):
+        load_corpus(str(tmp_path), "script")
+    (tmp_path / "00.txt").write_text("remote work", encoding="utf-8")
+    assert load_corpus(str(tmp_path), "script")[0]["text"] == "remote work"
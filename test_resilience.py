@@ -0,0 +1,246 @@
+# test_resilience.py
+
+import asyncio
+
+import pytest
+
+from resilience import CircuitBreaker, Stage, StageRejected, StageUnavailable, is_transient
+
+
+async def succeed():
+    return "ok"
+
+
+async def fail():
+    raise ConnectionError("boom")
+
+
+async def hang():
+    await asyncio.sleep(10)
+
+
+def test_breaker_recovers_after_cancelled_trial():
+    async def scenario():
+        stage = Stage("t", deadline=1.0, attempt_timeout=1.0, retries=0, failure_threshold=1, reset_timeout=0.05)
+        with pytest.raises(StageUnavailable):
+            await stage.call(fail)
+        assert stage.breaker.state == CircuitBreaker.OPEN
+
+        await asyncio.sleep(0.06)
+        trial = asyncio.ensure_future(stage.call(hang))
+        await asyncio.sleep(0.01)
+        assert stage.breaker.trial_in_flight
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        assert not stage.breaker.trial_in_flight
+        assert await stage.call(succeed) == "ok"
+        assert stage.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_retries_exhausted_raises_stage_unavailable():
+    async def scenario():
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            raise ConnectionError("boom")
+
+        stage = Stage("t", deadline=1.0, attempt_timeout=0.5, retries=2, backoff=0.001)
+        with pytest.raises(StageUnavailable, match="failed after 3 attempts"):
+            await stage.call(flaky)
+        assert len(calls) == 3
+
+    asyncio.run(scenario())
+
+
+def test_retry_recovers_from_transient_failure():
+    async def scenario():
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ConnectionError("boom")
+            return "ok"
+
+        stage = Stage("t", deadline=1.0, attempt_timeout=0.5, retries=2, backoff=0.001)
+        assert await stage.call(flaky) == "ok"
+        assert stage.breaker.failures == 0
+
+    asyncio.run(scenario())
+
+
+def test_deadline_cuts_off_retries():
+    async def scenario():
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(10)
+
+        stage = Stage("t", deadline=0.15, attempt_timeout=0.1, retries=5, backoff=0.001)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(StageUnavailable, match="deadline"):
+            await stage.call(slow)
+        assert loop.time() - start < 0.5
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_hedge_fires_after_delay_and_first_success_wins():
+    async def scenario():
+        calls = []
+
+        async def primary_straggles():
+            calls.append(1)
+            # The first request straggles; the hedged duplicate answers quickly.
+            await asyncio.sleep(1.0 if len(calls) == 1 else 0.01)
+            return len(calls)
+
+        stage = Stage("t", deadline=2.0, attempt_timeout=2.0, retries=0, hedge_after=0.05)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        assert await stage.call(primary_straggles) == 2
+        assert loop.time() - start < 0.5
+
+    asyncio.run(scenario())
+
+
+def test_no_hedge_when_hedging_is_off():
+    async def scenario():
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        stage = Stage("t", deadline=1.0, attempt_timeout=1.0, retries=0)
+        assert await stage.call(slow) == "ok"
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_breaker_opens_goes_half_open_and_closes():
+    async def scenario():
+        stage = Stage("t", deadline=1.0, attempt_timeout=1.0, retries=0, failure_threshold=2, reset_timeout=0.05)
+        for _ in range(2):
+            with pytest.raises(StageUnavailable):
+                await stage.call(fail)
+        assert stage.breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(StageUnavailable, match="circuit open"):
+            await stage.call(succeed)
+
+        await asyncio.sleep(0.06)
+        assert stage.breaker.allow()
+        assert stage.breaker.state == CircuitBreaker.HALF_OPEN
+        assert not stage.breaker.allow()  # Only one trial at a time.
+        stage.breaker.release_trial()
+
+        assert await stage.call(succeed) == "ok"
+        assert stage.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_failed_half_open_trial_reopens_breaker():
+    async def scenario():
+        stage = Stage("t", deadline=1.0, attempt_timeout=1.0, retries=0, failure_threshold=1, reset_timeout=0.05)
+        with pytest.raises(StageUnavailable):
+            await stage.call(fail)
+        await asyncio.sleep(0.06)
+        with pytest.raises(StageUnavailable, match="failed after"):
+            await stage.call(fail)
+        assert stage.breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(StageUnavailable, match="circuit open"):
+            await stage.call(succeed)
+
+    asyncio.run(scenario())
+
+
+def test_stale_failure_does_not_free_half_open_trial():
+    async def scenario():
+        async def slow_fail():
+            await asyncio.sleep(0.15)
+            raise ConnectionError("late")
+
+        stage = Stage("t", deadline=1.0, attempt_timeout=1.0, retries=0, failure_threshold=1, reset_timeout=0.05)
+        stale = asyncio.ensure_future(stage.call(slow_fail))  # Admitted while the circuit is closed.
+        await asyncio.sleep(0.01)
+        with pytest.raises(StageUnavailable):
+            await stage.call(fail)
+        assert stage.breaker.state == CircuitBreaker.OPEN
+
+        await asyncio.sleep(0.06)
+        trial = asyncio.ensure_future(stage.call(hang))
+        await asyncio.sleep(0.01)
+        with pytest.raises(StageUnavailable):
+            await stale
+
+        assert stage.breaker.state == CircuitBreaker.HALF_OPEN
+        assert stage.breaker.trial_in_flight
+        with pytest.raises(StageUnavailable, match="circuit open"):
+            await stage.call(succeed)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+    asyncio.run(scenario())
+
+
+class ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def test_is_transient_classifies_errors():
+    assert is_transient(TimeoutError())
+    assert is_transient(ConnectionError())
+    assert is_transient(ApiError(429))
+    assert is_transient(ApiError(503))
+    assert not is_transient(ApiError(400))
+    assert not is_transient(ApiError(403))
+    assert not is_transient(ValueError("response blocked by safety filters"))
+
+
+def test_non_retryable_error_is_rejected_without_retry_or_breaker_count():
+    async def scenario():
+        calls = []
+
+        async def bad_input():
+            calls.append(1)
+            raise ValueError("response blocked by safety filters")
+
+        stage = Stage("t", deadline=1.0, attempt_timeout=0.5, retries=2, backoff=0.001, failure_threshold=1)
+        with pytest.raises(StageRejected, match="non-retryable"):
+            await stage.call(bad_input)
+        assert len(calls) == 1
+        assert stage.breaker.state == CircuitBreaker.CLOSED
+        assert stage.breaker.failures == 0
+
+    asyncio.run(scenario())
+
+
+def test_transient_api_error_is_retried():
+    async def scenario():
+        calls = []
+
+        async def overloaded():
+            calls.append(1)
+            if len(calls) < 2:
+                raise ApiError(503)
+            return "ok"
+
+        stage = Stage("t", deadline=1.0, attempt_timeout=0.5, retries=2, backoff=0.001)
+        assert await stage.call(overloaded) == "ok"
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,24 @@
+# voice_synthesis.py (edge_tts synthesis shared by app.py, backend.py and load_simulator.py)
+
+import edge_tts
+
+from resilience import TTS_STAGE
+
+async def synthesize_speech(text: str, voice_name: str) -> bytes:
+    """
+    Streams one edge_tts synthesis into memory. Raises if the service returned no audio.
+    """
+    audio_bytes = b""
+    communicate = edge_tts.Communicate(text, voice_name)
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio_bytes += chunk["data"]
+    if not audio_bytes:
+        raise RuntimeError("edge_tts returned no audio")
+    return audio_bytes
+
+async def generate_speech(text: str, voice_name: str) -> bytes:
+    """
+    Synthesizes through the TTS resilience stage. Raises StageUnavailable on failure.
+    """
+    return await TTS_STAGE.call(lambda: synthesize_speech(text, voice_name))